@@ -1,10 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import Iterable, Iterator, List, Optional
 from datetime import datetime, date, timedelta
+import heapq
 from pydantic import BaseModel
 
+from ..core.availability import MAX_SPAN_DAYS, day_masks, find_free_slots
 from ..core.database import get_db
+from ..core.encoding import STREAM_BATCH_SIZE, stream_events
+from ..core.maintenance import archived_events, count_archived_events
+from ..core.write_buffer import WriteFailedError, write_buffer
 from ..models.calendar import CalendarEvent
 
 router = APIRouter()
@@ -96,15 +101,49 @@ class CalendarEventResponse(BaseModel):
         from_attributes = True
 
 
+def _serialize_events(events: Iterable[CalendarEvent]) -> Iterator[dict]:
+    for event in events:
+        yield CalendarEventResponse.model_validate(event).model_dump(mode="json")
+
+
+def _ensure_saved(db: Session, event_id: int) -> None:
+    """之前确认过的更新写入失败时返回 503，不返回数据库中的旧值"""
+    try:
+        write_buffer.ensure_saved(db, event_id)
+    except WriteFailedError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+
+def _stream_query(db: Session, query) -> tuple:
+    """
+    分批读取查询结果并逐批序列化，返回 (事件迭代器, 统计行数的函数)。
+    行数只有 MessagePack 需要，在流式查询开始后于同一连接上统计：游标未读完时
+    SQLite 保持同一个读快照，行数与实际返回的行一致。
+    依赖 get_db 在响应发送完之后才关闭会话（FastAPI < 0.106）。
+    """
+    rows = db.execute(
+        query.statement.execution_options(yield_per=STREAM_BATCH_SIZE)
+    ).scalars()
+
+    def count() -> int:
+        return db.query(query.order_by(None).subquery()).count()
+
+    return _serialize_events(rows), count
+
+
 @router.get("/events", response_model=List[CalendarEventResponse])
 def get_events(
+    request: Request,
     start_date: Optional[date] = None,
     end_date: Optional[date] = None,
     category: Optional[str] = None,
+    include_archived: bool = False,
     db: Session = Depends(get_db),
 ):
     from sqlalchemy import func
 
+    # 范围查询前先落盘暂存的更新，过滤条件才能看到最新值
+    write_buffer.flush()
     query = db.query(CalendarEvent)
 
     if start_date:
@@ -116,8 +155,25 @@ def get_events(
     if category:
         query = query.filter(CalendarEvent.category == category)
 
-    events = query.order_by(CalendarEvent.date).all()
-    return events
+    items, count = _stream_query(db, query.order_by(CalendarEvent.date))
+
+    # 需要时合并归档的历史事件，按日期排序
+    if include_archived:
+        archived = (
+            CalendarEventResponse.model_validate(row).model_dump(mode="json")
+            for row in archived_events(db, start_date, end_date, category)
+        )
+        # 两边都已按日期排序，逐行归并，不把归档整体读入内存
+        items = heapq.merge(archived, items, key=lambda item: item["date"])
+        count_hot = count
+
+        def count() -> int:
+            return count_hot() + count_archived_events(
+                db, start_date, end_date, category
+            )
+
+    # 按 Accept 返回 JSON 或 MessagePack，分批增量编码
+    return stream_events(request, items, count)
 
 
 @router.post("/events", response_model=CalendarEventResponse)
@@ -131,29 +187,31 @@ def create_event(event: CalendarEventCreate, db: Session = Depends(get_db)):
 
 @router.get("/events/{event_id}", response_model=CalendarEventResponse)
 def get_event(event_id: int, db: Session = Depends(get_db)):
+    _ensure_saved(db, event_id)
     event = db.query(CalendarEvent).filter(CalendarEvent.id == event_id).first()
     if event is None:
         raise HTTPException(status_code=404, detail="Event not found")
-    return event
+    return write_buffer.overlay(db, event)
 
 
 @router.put("/events/{event_id}", response_model=CalendarEventResponse)
 def update_event(
     event_id: int, event: CalendarEventUpdate, db: Session = Depends(get_db)
 ):
+    _ensure_saved(db, event_id)
     db_event = db.query(CalendarEvent).filter(CalendarEvent.id == event_id).first()
     if db_event is None:
         raise HTTPException(status_code=404, detail="Event not found")
 
-    # 只更新非None的字段
-    for field, value in event.dict(exclude_unset=True).items():
-        if value is not None:
-            setattr(db_event, field, value)
-
-    db_event.updated_at = datetime.utcnow()
-    db.commit()
-    db.refresh(db_event)
-    return db_event
+    # 只更新非None的字段，暂存到写缓冲，由后台合并成一条 UPDATE
+    changes = {
+        field: value
+        for field, value in event.dict(exclude_unset=True).items()
+        if value is not None
+    }
+    if changes:
+        write_buffer.stage(db, event_id, changes)
+    return write_buffer.overlay(db, db_event)
 
 
 @router.delete("/events/{event_id}")
@@ -162,26 +220,100 @@ def delete_event(event_id: int, db: Session = Depends(get_db)):
     if db_event is None:
         raise HTTPException(status_code=404, detail="Event not found")
 
+    write_buffer.discard(db, event_id)
     db.delete(db_event)
     db.commit()
     return {"message": "Event deleted successfully"}
 
 
+def iso_week_range(year: int, week: int) -> tuple:
+    """ISO-8601 周（周一开始）的第一天和最后一天"""
+    start_date = date.fromisocalendar(year, week, 1)
+    return start_date, start_date + timedelta(days=6)
+
+
+def _iso_week_ref(day: date) -> dict:
+    iso = day.isocalendar()
+    return {"year": iso[0], "week": iso[1]}
+
+
 # 获取周视图数据
 @router.get("/week/{year}/{week}")
-def get_week_view(year: int, week: int, db: Session = Depends(get_db)):
-    # 计算周的开始和结束日期
-    start_date = datetime.strptime(f"{year}-W{week:02d}-1", "%Y-W%W-%w").date()
-    end_date = start_date + timedelta(days=6)
-
-    events = (
+def get_week_view(
+    request: Request,
+    year: int,
+    week: int,
+    prefetch: bool = False,
+    db: Session = Depends(get_db),
+):
+    try:
+        start_date, end_date = iso_week_range(year, week)
+        # prefetch 时一次查询前后各一周，events 覆盖整个窗口，供前后翻页直接使用
+        window_start, window_end = start_date, end_date
+        if prefetch:
+            window_start -= timedelta(days=7)
+            window_end += timedelta(days=7)
+    except (ValueError, OverflowError):
+        raise HTTPException(status_code=400, detail="Invalid ISO week")
+
+    envelope = {
+        "year": year,
+        "week": week,
+        "start_date": start_date.isoformat(),
+        "end_date": end_date.isoformat(),
+    }
+    if prefetch:
+        envelope.update(
+            window_start=window_start.isoformat(),
+            window_end=window_end.isoformat(),
+            previous=_iso_week_ref(window_start),
+            next=_iso_week_ref(window_end),
+        )
+
+    write_buffer.flush()
+    # 结束日取到当天最后时刻，结束日当天的事件不会被漏掉，也不会在 date.max 溢出
+    since = datetime.combine(window_start, datetime.min.time())
+    until = datetime.combine(window_end, datetime.max.time())
+    items, count = _stream_query(
+        db,
         db.query(CalendarEvent)
-        .filter(CalendarEvent.date >= start_date, CalendarEvent.date <= end_date)
-        .order_by(CalendarEvent.date)
-        .all()
+        .filter(CalendarEvent.date >= since, CalendarEvent.date <= until)
+        .order_by(CalendarEvent.date),
     )
 
-    return {"start_date": start_date, "end_date": end_date, "events": events}
+    return stream_events(request, items, count, envelope)
+
+
+# 查询空闲时间段
+@router.get("/availability")
+def get_availability(
+    start_date: date,
+    end_date: date,
+    length: int = Query(1, ge=1, le=17),
+    limit: int = Query(10, ge=1, le=1000),
+    calendars: Optional[List[str]] = Query(None),
+    db: Session = Depends(get_db),
+):
+    if end_date < start_date:
+        raise HTTPException(
+            status_code=400, detail="end_date must not be before start_date"
+        )
+    if (end_date - start_date).days + 1 > MAX_SPAN_DAYS:
+        raise HTTPException(
+            status_code=400, detail=f"Date range must not exceed {MAX_SPAN_DAYS} days"
+        )
+
+    # 位图由写缓冲的 UPDATE 维护，查询前先落盘
+    write_buffer.flush()
+    masks = day_masks(db, start_date, end_date, calendars)
+    slots = find_free_slots(masks, start_date, end_date, length=length, limit=limit)
+
+    return {
+        "start_date": start_date,
+        "end_date": end_date,
+        "length": length,
+        "slots": slots,
+    }
 
 
 # 获取统计数据
@@ -193,6 +325,7 @@ def get_monthly_stats(year: int, month: int, db: Session = Depends(get_db)):
     else:
         end_date = datetime(year, month + 1, 1)
 
+    write_buffer.flush()
     events = (
         db.query(CalendarEvent)
         .filter(CalendarEvent.date >= start_date, CalendarEvent.date < end_date)
@@ -0,0 +1,234 @@
+"""
+请求准入控制
+
+- 每个客户端 + 路由一个令牌桶，按请求成本扣令牌，超限返回 429
+- 高成本请求（无日期范围的查询、长范围查询、统计）受并发上限约束，
+  排队超时或队列已满返回 503
+- 准入和拒绝次数记录在 admission_counters 中
+- 来自受信任代理的请求按 X-Forwarded-For 区分客户端
+
+各项限制可通过环境变量配置。
+"""
+
+import asyncio
+import json
+import math
+import os
+import re
+import time
+from collections import Counter
+from datetime import date
+from typing import Collection, Dict, Optional, Tuple
+from urllib.parse import parse_qs
+
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+# 每个客户端每条路由每秒补充的令牌数，以及桶容量（允许的突发）
+RATE_LIMIT_PER_SECOND = float(os.getenv("RATE_LIMIT_PER_SECOND", "10"))
+RATE_LIMIT_BURST = float(os.getenv("RATE_LIMIT_BURST", "40"))
+# 高成本请求的并发上限、排队长度和排队超时（秒）
+EXPENSIVE_CONCURRENCY = int(os.getenv("EXPENSIVE_CONCURRENCY", "4"))
+EXPENSIVE_QUEUE_SIZE = int(os.getenv("EXPENSIVE_QUEUE_SIZE", "16"))
+EXPENSIVE_QUEUE_TIMEOUT = float(os.getenv("EXPENSIVE_QUEUE_TIMEOUT", "2"))
+# 成本达到该值即视为高成本请求
+EXPENSIVE_COST = float(os.getenv("EXPENSIVE_COST", "4"))
+# 没有日期范围的查询按全表扫描计价
+UNBOUNDED_COST = float(os.getenv("UNBOUNDED_COST", "20"))
+# 每多少天的日期跨度增加 1 点成本
+DAYS_PER_COST = 30
+# 包含归档事件的查询额外增加的成本（需要逐行解压）
+ARCHIVE_COST = float(os.getenv("ARCHIVE_COST", "10"))
+# 受信任的反向代理地址，逗号分隔；默认信任本机，即前端开发服务器的代理
+TRUSTED_PROXIES = frozenset(
+    address.strip()
+    for address in os.getenv("TRUSTED_PROXIES", "127.0.0.1,::1").split(",")
+    if address.strip()
+)
+
+# 路由中的数字段归一化，使 /events/1 和 /events/2 共用一个桶
+_ID_SEGMENT = re.compile(r"/\d+(?=/|$)")
+# 清理长时间未使用的令牌桶
+_BUCKET_IDLE_SECONDS = 600
+_TRUE_VALUES = {"1", "true", "t", "yes", "y", "on"}
+
+admission_counters: Counter = Counter()
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def take(self, cost: float) -> float:
+        """扣除 cost 个令牌；成功返回 0，否则返回需要等待的秒数"""
+        now = time.monotonic()
+        elapsed = now - self.updated
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+        self.updated = now
+        # 成本超过桶容量的请求在桶满时也允许通过，避免永远被拒绝
+        cost = min(cost, self.capacity)
+        if self.tokens >= cost:
+            self.tokens -= cost
+            return 0.0
+        return (cost - self.tokens) / self.rate
+
+
+def _parse_date(value: Optional[str]) -> Optional[date]:
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        return None
+
+
+def estimate_cost(method: str, route: str, query_string: bytes) -> float:
+    """根据路由和请求的日期跨度估算成本"""
+    if method != "GET":
+        return 1.0
+
+    if route.endswith("/stats/{id}/{id}"):
+        # 月度统计：扫描整月事件
+        return EXPENSIVE_COST
+
+    if route.endswith("/events") or route.endswith("/availability"):
+        params = parse_qs(query_string.decode("latin-1"))
+        start = _parse_date(params.get("start_date", [None])[0])
+        end = _parse_date(params.get("end_date", [None])[0])
+        if start is None or end is None:
+            cost = UNBOUNDED_COST
+        else:
+            span_days = max((end - start).days + 1, 1)
+            cost = min(1.0 + math.ceil(span_days / DAYS_PER_COST), UNBOUNDED_COST)
+        include_archived = params.get("include_archived", [""])[0]
+        if route.endswith("/events") and include_archived.lower() in _TRUE_VALUES:
+            cost += ARCHIVE_COST
+        return cost
+
+    return 1.0
+
+
+def client_key(scope: Scope, trusted_proxies: Collection[str] = TRUSTED_PROXIES) -> str:
+    """
+    限流用的客户端标识。直连地址是受信任的代理时，从 X-Forwarded-For 右侧
+    开始跳过代理地址，第一个不受信任的地址就是客户端（左侧的值可以被伪造）
+    """
+    client = scope["client"][0] if scope.get("client") else "unknown"
+    if client not in trusted_proxies:
+        return client
+    forwarded = Headers(scope=scope).get("x-forwarded-for", "")
+    for address in reversed(forwarded.split(",")):
+        address = address.strip()
+        if address and address not in trusted_proxies:
+            return address
+    return client
+
+
+async def _reject(send: Send, status: int, detail: str, retry_after: float) -> None:
+    body = json.dumps({"detail": detail}).encode("utf-8")
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
+
+
+class AdmissionMiddleware:
+    def __init__(
+        self,
+        app: ASGIApp,
+        rate: float = RATE_LIMIT_PER_SECOND,
+        burst: float = RATE_LIMIT_BURST,
+        concurrency: int = EXPENSIVE_CONCURRENCY,
+        queue_size: int = EXPENSIVE_QUEUE_SIZE,
+        queue_timeout: float = EXPENSIVE_QUEUE_TIMEOUT,
+        trusted_proxies: Collection[str] = TRUSTED_PROXIES,
+    ):
+        self.app = app
+        self.rate = rate
+        self.burst = burst
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.concurrency = concurrency
+        self.trusted_proxies = trusted_proxies
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._waiting = 0
+        self._buckets: Dict[Tuple[str, str], TokenBucket] = {}
+        self._last_prune = time.monotonic()
+
+    def _bucket(self, client: str, route: str) -> TokenBucket:
+        now = time.monotonic()
+        if now - self._last_prune > _BUCKET_IDLE_SECONDS:
+            self._last_prune = now
+            self._buckets = {
+                key: bucket
+                for key, bucket in self._buckets.items()
+                if now - bucket.updated < _BUCKET_IDLE_SECONDS
+            }
+        key = (client, route)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(self.rate, self.burst)
+        return bucket
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+
+        client = client_key(scope, self.trusted_proxies)
+        route = f"{scope['method']} {_ID_SEGMENT.sub('/{id}', scope['path'])}"
+        cost = estimate_cost(scope["method"], route, scope.get("query_string", b""))
+
+        retry_after = self._bucket(client, route).take(cost)
+        if retry_after > 0:
+            admission_counters["rejected_rate_limited"] += 1
+            await _reject(send, 429, "Too many requests", retry_after)
+            return
+
+        if cost < EXPENSIVE_COST:
+            admission_counters["admitted"] += 1
+            await self.app(scope, receive, send)
+            return
+
+        await self._run_expensive(scope, receive, send)
+
+    async def _run_expensive(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+
+        if not self._semaphore.locked():
+            # 有空闲名额时 acquire 不会挂起
+            await self._semaphore.acquire()
+        else:
+            if self._waiting >= self.queue_size:
+                admission_counters["rejected_queue_full"] += 1
+                await _reject(send, 503, "Server busy", self.queue_timeout)
+                return
+            admission_counters["queued"] += 1
+            self._waiting += 1
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+            except asyncio.TimeoutError:
+                admission_counters["rejected_queue_timeout"] += 1
+                await _reject(send, 503, "Server busy", self.queue_timeout)
+                return
+            finally:
+                self._waiting -= 1
+
+        admission_counters["admitted"] += 1
+        admission_counters["admitted_expensive"] += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self._semaphore.release()
@@ -0,0 +1,122 @@
+"""
+空闲时间查询
+
+每个事件保存 17 位的占用位图 (busy_mask)，这里只读取日期和位图两列，
+按天 OR 合并后用位运算查找连续的空闲时间段，不需要加载时间段文本。
+"""
+
+from datetime import date, datetime, time, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import inspect, select, text, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from ..models.calendar import (
+    FIRST_SLOT_HOUR,
+    FULL_MASK,
+    SESSION_MASKS,
+    SLOT_BITS,
+    SLOT_FIELDS,
+    CalendarEvent,
+    compute_masks,
+)
+
+# 单次查询允许的最大日期跨度（天）
+MAX_SPAN_DAYS = 366 * 2
+
+
+def ensure_availability_index(engine: Engine) -> None:
+    """为旧数据库补上位图列和日期索引，并回填已有数据"""
+    columns = {c["name"] for c in inspect(engine).get_columns("calendar_events")}
+    missing = [c for c in ("busy_mask", "completed_mask") if c not in columns]
+
+    with engine.begin() as conn:
+        for column in missing:
+            conn.execute(
+                text(
+                    f"ALTER TABLE calendar_events "
+                    f"ADD COLUMN {column} INTEGER NOT NULL DEFAULT 0"
+                )
+            )
+        conn.execute(
+            text(
+                "CREATE INDEX IF NOT EXISTS ix_calendar_events_date_busy "
+                "ON calendar_events (date, busy_mask)"
+            )
+        )
+
+        if not missing:
+            return
+        fields = list(SLOT_BITS) + list(SESSION_MASKS)
+        rows = conn.execute(
+            select(CalendarEvent.id, *[getattr(CalendarEvent, f) for f in fields])
+        ).mappings()
+        for row in rows.all():
+            busy, completed = compute_masks(row)
+            conn.execute(
+                update(CalendarEvent)
+                .where(CalendarEvent.id == row["id"])
+                .values(busy_mask=busy, completed_mask=completed)
+            )
+
+
+def day_masks(
+    db: Session,
+    start_date: date,
+    end_date: date,
+    calendars: Optional[List[str]] = None,
+) -> Dict[date, int]:
+    """每天的占用位图；传入多个日历（分类）时取并集，即所有日历都空闲才算空闲"""
+    # 直接按 date 列取范围，可以只走 (date, busy_mask) 索引
+    query = db.query(CalendarEvent.date, CalendarEvent.busy_mask).filter(
+        CalendarEvent.date >= datetime.combine(start_date, time.min),
+        CalendarEvent.date <= datetime.combine(end_date, time.max),
+        CalendarEvent.busy_mask != 0,
+    )
+    if calendars:
+        query = query.filter(CalendarEvent.category.in_(calendars))
+
+    masks: Dict[date, int] = {}
+    for event_date, mask in query:
+        key = event_date.date()
+        masks[key] = masks.get(key, 0) | mask
+    return masks
+
+
+def free_runs(busy: int, length: int) -> int:
+    """返回位图：第 i 位为 1 表示从第 i 个时间段起连续 length 个时间段都空闲"""
+    free = ~busy & FULL_MASK
+    runs = free
+    for shift in range(1, length):
+        runs &= free >> shift
+    return runs
+
+
+def find_free_slots(
+    masks: Dict[date, int],
+    start_date: date,
+    end_date: date,
+    length: int = 1,
+    limit: int = 10,
+) -> List[dict]:
+    """按时间顺序查找前 limit 个长度为 length 小时的空闲时间段（不跨天）"""
+    results: List[dict] = []
+    # 按偏移量遍历，避免在 date.max 之后再加一天溢出
+    for offset in range((end_date - start_date).days + 1):
+        if len(results) >= limit:
+            break
+        current = start_date + timedelta(days=offset)
+        runs = free_runs(masks.get(current, 0), length)
+        while runs and len(results) < limit:
+            index = (runs & -runs).bit_length() - 1
+            runs &= runs - 1
+            results.append(
+                {
+                    "date": current.isoformat(),
+                    "start_hour": FIRST_SLOT_HOUR + index,
+                    "end_hour": FIRST_SLOT_HOUR + index + length,
+                    "slots": SLOT_FIELDS[index : index + length],
+                }
+            )
+    return results
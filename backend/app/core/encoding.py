@@ -0,0 +1,292 @@
+"""
+响应编码与压缩
+
+- CompressionMiddleware: 按 Accept-Encoding 协商 br / gzip 压缩，小响应不压缩
+- stream_events: 按 Accept 协商 JSON 或 MessagePack，分批增量编码事件列表
+"""
+
+import json
+import zlib
+from typing import Callable, Dict, Iterable, Iterator, Optional
+
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # brotli 为可选依赖，缺失时只提供 gzip
+    brotli = None
+
+try:
+    import msgpack
+except ImportError:  # msgpack 为可选依赖，缺失时只返回 JSON
+    msgpack = None
+
+MSGPACK_MEDIA_TYPES = ("application/x-msgpack", "application/msgpack")
+# 小于该字节数的响应不压缩
+COMPRESS_MINIMUM_SIZE = 1024
+# 每批编码的事件数
+STREAM_BATCH_SIZE = 200
+
+
+def _parse_qvalues(header: str) -> Dict[str, float]:
+    """
+    解析 Accept / Accept-Encoding 这类带 q 值的头，返回 {名称: q}。
+    q 值无法解析的项视为不可接受 (q=0)。
+    """
+    qvalues: Dict[str, float] = {}
+    for part in header.split(","):
+        name, *params = [p.strip() for p in part.split(";")]
+        if not name:
+            continue
+        q = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+                if not 0.0 <= q <= 1.0:
+                    q = 0.0
+        qvalues[name.lower()] = q
+    return qvalues
+
+
+def _choose_compressor(accept_encoding: str):
+    qvalues = _parse_qvalues(accept_encoding)
+    wildcard = qvalues.get("*", 0.0)
+    candidates = [_GzipCompressor]
+    if brotli is not None:
+        # q 值相同时优先 br
+        candidates.insert(0, _BrotliCompressor)
+
+    best, best_q = None, 0.0
+    for compressor in candidates:
+        q = qvalues.get(compressor.encoding, wildcard)
+        if q > best_q:
+            best, best_q = compressor, q
+    return best
+
+
+class _GzipCompressor:
+    encoding = "gzip"
+
+    def __init__(self):
+        self._compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush(
+            zlib.Z_SYNC_FLUSH
+        )
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+class _BrotliCompressor:
+    encoding = "br"
+
+    def __init__(self):
+        self._compressor = brotli.Compressor(quality=5)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data) + self._compressor.flush()
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+class CompressionMiddleware:
+    def __init__(self, app: ASGIApp, minimum_size: int = COMPRESS_MINIMUM_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http":
+            compressor = _choose_compressor(
+                Headers(scope=scope).get("Accept-Encoding", "")
+            )
+            if compressor is not None:
+                responder = _CompressionResponder(
+                    self.app, compressor, self.minimum_size
+                )
+                await responder(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
+
+
+class _CompressionResponder:
+    """
+    与 starlette 的 GZipResponder 相同的流程，压缩算法可替换。
+    流式响应的第一块通常很小，先缓存到 minimum_size 字节或响应结束，
+    再决定是否压缩
+    """
+
+    def __init__(self, app: ASGIApp, compressor, minimum_size: int):
+        self.app = app
+        self.compressor_cls = compressor
+        self.compressor = None
+        self.minimum_size = minimum_size
+        self.send: Optional[Send] = None
+        self.initial_message: Message = {}
+        self.started = False
+        self.passthrough = False
+        self.buffered = b""
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        self.send = send
+        await self.app(scope, receive, self.send_compressed)
+
+    def _set_headers(self, content_length: Optional[int]) -> None:
+        headers = MutableHeaders(raw=self.initial_message["headers"])
+        headers["Content-Encoding"] = self.compressor_cls.encoding
+        headers.add_vary_header("Accept-Encoding")
+        if content_length is None:
+            del headers["Content-Length"]
+        else:
+            headers["Content-Length"] = str(content_length)
+
+    async def send_compressed(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            # 确定如何改写响应头之前先不发送
+            self.initial_message = message
+            headers = Headers(raw=message["headers"])
+            self.passthrough = "content-encoding" in headers
+            return
+        if message["type"] != "http.response.body":
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.passthrough:
+            if not self.started:
+                self.started = True
+                await self.send(self.initial_message)
+            await self.send(message)
+        elif not self.started:
+            self.buffered += body
+            if more_body and len(self.buffered) < self.minimum_size:
+                return
+            self.started = True
+            body, self.buffered = self.buffered, b""
+            if len(body) < self.minimum_size:
+                # 小响应直接发送
+                self.passthrough = True
+                await self.send(self.initial_message)
+                await self.send({**message, "body": body})
+                return
+            self.compressor = self.compressor_cls()
+            if more_body:
+                # 流式响应：逐块压缩并立即发送
+                self._set_headers(None)
+                body = self.compressor.compress(body)
+            else:
+                body = self.compressor.compress(body) + self.compressor.finish()
+                self._set_headers(len(body))
+            await self.send(self.initial_message)
+            await self.send({**message, "body": body})
+        else:
+            data = self.compressor.compress(body)
+            if not more_body:
+                data += self.compressor.finish()
+            message["body"] = data
+            await self.send(message)
+
+
+def wants_msgpack(request: Request) -> bool:
+    if msgpack is None:
+        return False
+    qvalues = _parse_qvalues(request.headers.get("Accept", ""))
+    # MessagePack 必须显式请求，通配符只匹配默认的 JSON
+    msgpack_q = max(qvalues.get(media_type, 0.0) for media_type in MSGPACK_MEDIA_TYPES)
+    json_q = max(
+        qvalues.get(media_type, 0.0)
+        for media_type in ("application/json", "application/*", "*/*")
+    )
+    return msgpack_q > 0 and msgpack_q >= json_q
+
+
+def _batches(items: Iterable[dict]) -> Iterator[list]:
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= STREAM_BATCH_SIZE:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def encode_json(
+    items: Iterable[dict], envelope: Optional[dict] = None, key: str = "events"
+) -> Iterator[bytes]:
+    """增量编码为 JSON：无 envelope 时输出数组，否则输出 {**envelope, key: [...]}"""
+    if envelope is None:
+        yield b"["
+    else:
+        head = json.dumps(envelope, ensure_ascii=False, separators=(",", ":"))
+        head = head[:-1] + ("," if envelope else "") + json.dumps(key) + ":["
+        yield head.encode("utf-8")
+
+    first = True
+    for batch in _batches(items):
+        chunk = ",".join(
+            json.dumps(item, ensure_ascii=False, separators=(",", ":"))
+            for item in batch
+        )
+        yield (chunk if first else "," + chunk).encode("utf-8")
+        first = False
+
+    yield b"]" if envelope is None else b"]}"
+
+
+def encode_msgpack(
+    items: Iterable[dict],
+    count: int,
+    envelope: Optional[dict] = None,
+    key: str = "events",
+) -> Iterator[bytes]:
+    """增量编码为 MessagePack，省略值为 None 的字段（大部分空时间段）"""
+    packer = msgpack.Packer(use_bin_type=True)
+    head = b""
+    if envelope is not None:
+        head += packer.pack_map_header(len(envelope) + 1)
+        for name, value in envelope.items():
+            head += packer.pack(name) + packer.pack(value)
+        head += packer.pack(key)
+    yield head + packer.pack_array_header(count)
+
+    for batch in _batches(items):
+        yield b"".join(
+            packer.pack({k: v for k, v in item.items() if v is not None})
+            for item in batch
+        )
+
+
+def stream_events(
+    request: Request,
+    items: Iterable[dict],
+    count: Callable[[], int],
+    envelope: Optional[dict] = None,
+    key: str = "events",
+) -> StreamingResponse:
+    """
+    按 Accept 头选择编码，返回增量编码的流式响应。
+    只有 MessagePack 需要预先写出数组长度，count 只在这时调用
+    """
+    if wants_msgpack(request):
+        return StreamingResponse(
+            encode_msgpack(items, count(), envelope, key),
+            media_type=MSGPACK_MEDIA_TYPES[0],
+            headers={"Vary": "Accept"},
+        )
+    return StreamingResponse(
+        encode_json(items, envelope, key),
+        media_type="application/json",
+        headers={"Vary": "Accept"},
+    )
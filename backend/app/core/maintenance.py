@@ -0,0 +1,283 @@
+"""
+数据库维护：在线备份、增量压缩和历史事件归档
+
+- backup_database: 使用 SQLite 的在线备份 API 分步复制，每步之后释放读锁并休眠，不阻塞写入
+- incremental_vacuum: 回收删除事件留下的空闲页
+- archive_events: 把早于截止日期的事件压缩后移入归档表，热表只保留近期数据
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time as _time
+import zlib
+from datetime import date, datetime, time, timedelta
+from typing import Callable, Iterator, Optional
+
+from sqlalchemy import func, or_, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from sqlalchemy.schema import CreateIndex, CreateTable
+
+from .database import engine as default_engine
+from ..models.calendar import ArchivedEvent, CalendarEvent
+
+logger = logging.getLogger(__name__)
+
+# 后台压缩的间隔（秒）和每次最多回收的页数
+VACUUM_INTERVAL = float(os.getenv("VACUUM_INTERVAL", "3600"))
+VACUUM_MAX_PAGES = int(os.getenv("VACUUM_MAX_PAGES", "2000"))
+# 在线备份每步复制的页数和每步之后的休眠（秒），给写入留出时间
+BACKUP_PAGES_PER_STEP = 256
+BACKUP_SLEEP = 0.05
+# 归档时每批移动的事件数
+ARCHIVE_BATCH_SIZE = 500
+# 最近这么久（秒）内更新过的事件不归档。归档在服务进程之外执行，服务端写缓冲里
+# 尚未落盘的更新之后会以 UPDATE 形式写入，行已移走时就会丢失；正在编辑的事件
+# 每个合并窗口（远小于该值）都会刷新 updated_at，因此会被跳过
+ARCHIVE_MIN_IDLE_SECONDS = 60
+
+# 位图是热表的查询索引，不需要归档
+_ARCHIVE_EXCLUDED = {"busy_mask", "completed_mask"}
+
+
+def configure_storage(engine: Engine = default_engine) -> None:
+    """
+    开启 WAL（备份和读取不阻塞写入）和增量 auto_vacuum。
+    旧数据库第一次切换 auto_vacuum 需要执行一次完整 VACUUM。
+    """
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.exec_driver_sql("PRAGMA journal_mode=WAL")
+        if conn.exec_driver_sql("PRAGMA auto_vacuum").scalar() != 2:
+            conn.exec_driver_sql("PRAGMA auto_vacuum=INCREMENTAL")
+            conn.exec_driver_sql("VACUUM")
+
+
+def ensure_autoincrement(engine: Engine = default_engine) -> None:
+    """
+    旧数据库的 calendar_events 没有 AUTOINCREMENT，最大 id 的事件被删除或归档后
+    id 会被复用，和归档表冲突。这里在一个事务里重建表，并让 id 序列从热表和
+    归档表中最大的 id 之后开始。
+    """
+    with engine.connect() as conn:
+        table_sql = conn.exec_driver_sql(
+            "SELECT sql FROM sqlite_master "
+            "WHERE type = 'table' AND name = 'calendar_events'"
+        ).scalar()
+        if table_sql is None or "AUTOINCREMENT" in table_sql.upper():
+            return
+        old_indexes = (
+            conn.exec_driver_sql(
+                "SELECT name FROM sqlite_master "
+                "WHERE type = 'index' AND tbl_name = 'calendar_events' AND sql IS NOT NULL"
+            )
+            .scalars()
+            .all()
+        )
+        archived_max = conn.execute(select(func.max(ArchivedEvent.id))).scalar() or 0
+
+        table = CalendarEvent.__table__
+        columns = ", ".join(column.name for column in table.columns)
+        statements = ["ALTER TABLE calendar_events RENAME TO calendar_events_old"]
+        # 索引名随旧表保留，先删掉才能按模型重建
+        statements += [f'DROP INDEX "{name}"' for name in old_indexes]
+        statements.append(str(CreateTable(table).compile(conn)))
+        statements += [str(CreateIndex(index).compile(conn)) for index in table.indexes]
+        statements += [
+            f"INSERT INTO calendar_events ({columns}) "
+            f"SELECT {columns} FROM calendar_events_old",
+            "DROP TABLE calendar_events_old",
+            f"UPDATE sqlite_sequence SET seq = MAX(seq, {int(archived_max)}) "
+            "WHERE name = 'calendar_events'",
+            f"INSERT INTO sqlite_sequence (name, seq) "
+            f"SELECT 'calendar_events', {int(archived_max)} WHERE NOT EXISTS "
+            "(SELECT 1 FROM sqlite_sequence WHERE name = 'calendar_events')",
+        ]
+        conn.commit()
+        # executescript 里显式 BEGIN/COMMIT，DDL 也在同一个事务中
+        conn.connection.driver_connection.executescript(
+            "BEGIN;\n" + ";\n".join(statements) + ";\nCOMMIT;"
+        )
+
+
+def incremental_vacuum(
+    engine: Engine = default_engine, max_pages: Optional[int] = None
+) -> int:
+    """回收空闲页，返回回收的页数"""
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        free_pages = conn.exec_driver_sql("PRAGMA freelist_count").scalar()
+        if not free_pages:
+            return 0
+        pages = free_pages if max_pages is None else min(free_pages, max_pages)
+        # sqlite3 的 execute 只执行一步（只回收一页），executescript 才会执行完
+        conn.connection.driver_connection.executescript(
+            f"PRAGMA incremental_vacuum({int(pages)});"
+        )
+        return free_pages - conn.exec_driver_sql("PRAGMA freelist_count").scalar()
+
+
+def backup_database(
+    dest_path: str,
+    engine: Engine = default_engine,
+    pages: int = BACKUP_PAGES_PER_STEP,
+    sleep: float = BACKUP_SLEEP,
+    progress: Optional[Callable[[int, int, int], None]] = None,
+) -> None:
+    """
+    在线备份到 dest_path；备份期间的写入会被包含在最终结果中。
+    每步复制 pages 页后休眠 sleep 秒，读锁只在每一步内持有。
+    """
+
+    def throttle(status: int, remaining: int, total: int) -> None:
+        # sqlite3 只在 BUSY/LOCKED 时休眠，在进度回调里主动让出
+        if progress is not None:
+            progress(status, remaining, total)
+        if remaining and sleep > 0:
+            _time.sleep(sleep)
+
+    source = sqlite3.connect(engine.url.database)
+    target = sqlite3.connect(dest_path)
+    try:
+        source.backup(target, pages=pages, progress=throttle, sleep=sleep)
+    finally:
+        target.close()
+        source.close()
+
+
+def _event_payload(event: CalendarEvent) -> bytes:
+    row = {}
+    for column in CalendarEvent.__table__.columns:
+        if column.name in _ARCHIVE_EXCLUDED:
+            continue
+        value = getattr(event, column.name)
+        row[column.name] = value.isoformat() if isinstance(value, datetime) else value
+    return zlib.compress(
+        json.dumps(row, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    )
+
+
+def archive_events(db: Session, before: date) -> int:
+    """
+    把 before 之前的事件移入归档表，返回移动的事件数。
+    归档事件只读：GET /events?include_archived=true 可以查到，但不能再更新或删除。
+    截止日期应早于任何仍可能被编辑的日期。
+    """
+    cutoff = datetime.combine(before, time.min)
+    idle_since = datetime.utcnow() - timedelta(seconds=ARCHIVE_MIN_IDLE_SECONDS)
+    moved = 0
+    while True:
+        events = (
+            db.query(CalendarEvent)
+            .filter(
+                CalendarEvent.date < cutoff,
+                or_(
+                    CalendarEvent.updated_at.is_(None),
+                    CalendarEvent.updated_at < idle_since,
+                ),
+            )
+            .order_by(CalendarEvent.id)
+            .limit(ARCHIVE_BATCH_SIZE)
+            .all()
+        )
+        if not events:
+            return moved
+        for event in events:
+            # 直接 INSERT：id 冲突时报错，不覆盖已归档的事件
+            db.add(
+                ArchivedEvent(
+                    id=event.id,
+                    date=event.date,
+                    category=event.category,
+                    payload=_event_payload(event),
+                )
+            )
+            db.delete(event)
+        # 每批单独提交，避免长时间持有写锁
+        db.commit()
+        moved += len(events)
+
+
+def _archived_query(
+    db: Session,
+    start_date: Optional[date],
+    end_date: Optional[date],
+    category: Optional[str],
+):
+    query = db.query(ArchivedEvent.payload)
+    if start_date:
+        query = query.filter(
+            ArchivedEvent.date >= datetime.combine(start_date, time.min)
+        )
+    if end_date:
+        query = query.filter(ArchivedEvent.date <= datetime.combine(end_date, time.max))
+    if category:
+        query = query.filter(ArchivedEvent.category == category)
+    return query
+
+
+def archived_events(
+    db: Session,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    category: Optional[str] = None,
+) -> Iterator[dict]:
+    """按日期和分类查询归档事件，按日期顺序分批读取并逐行解压"""
+    query = _archived_query(db, start_date, end_date, category).order_by(
+        ArchivedEvent.date
+    )
+    rows = db.execute(
+        query.statement.execution_options(yield_per=ARCHIVE_BATCH_SIZE)
+    ).scalars()
+    return (json.loads(zlib.decompress(payload)) for payload in rows)
+
+
+def count_archived_events(
+    db: Session,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    category: Optional[str] = None,
+) -> int:
+    return _archived_query(db, start_date, end_date, category).count()
+
+
+class MaintenanceScheduler:
+    """后台定期执行增量压缩"""
+
+    def __init__(
+        self,
+        engine: Engine = default_engine,
+        interval: float = VACUUM_INTERVAL,
+        max_pages: int = VACUUM_MAX_PAGES,
+    ):
+        self.engine = engine
+        self.interval = interval
+        self.max_pages = max_pages
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                incremental_vacuum(self.engine, self.max_pages)
+            except Exception:
+                logger.exception("增量压缩失败")
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="database-maintenance", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+
+maintenance = MaintenanceScheduler()
@@ -0,0 +1,239 @@
+"""
+事件写缓冲 (write-behind)
+
+表格里连续编辑单元格时，每次 PUT 都会触发一次整行提交。这里把短时间窗口内
+对同一事件的部分更新合并起来，由后台线程按窗口批量刷入数据库，每个事件只执行
+一条只包含变更列的 UPDATE。
+
+暂存的更新按请求会话绑定的 engine 区分，落盘时写回同一个数据库。
+"""
+
+import logging
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Hashable, Optional, Tuple
+
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from ..models.calendar import CalendarEvent, mask_update_values
+
+logger = logging.getLogger(__name__)
+
+# 合并窗口（秒）：同一事件的第一次暂存之后，最多等待这么久再落盘
+COALESCE_WINDOW = 0.5
+# 同一事件连续写入失败达到该次数后停止后台重试，留到下次读取或更新该事件时处理
+MAX_FLUSH_ATTEMPTS = 3
+
+# (engine, 事件 id)
+Key = Tuple[Hashable, int]
+
+
+class WriteFailedError(Exception):
+    """事件已确认的更新多次写入失败，数据库中的值不是最新的"""
+
+
+class WriteBuffer:
+    def __init__(self, window: float = COALESCE_WINDOW):
+        self.window = window
+        self._pending: Dict[Key, dict] = {}
+        self._first_staged: Dict[Key, float] = {}
+        # 已从 _pending 取出、尚未提交的更新，提交前仍要对读取可见
+        self._inflight: Dict[Key, dict] = {}
+        self._failures: Dict[Key, int] = {}
+        # 多次写入失败、停止后台重试的更新及最后一次的错误
+        self._failed: Dict[Key, Tuple[dict, Exception]] = {}
+        self._lock = threading.Lock()
+        # 保证同一时刻只有一个 flush 在写库，避免同一事件的新旧值乱序提交
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.counters: Counter = Counter()
+
+    @staticmethod
+    def _key(db: Session, event_id: int) -> Key:
+        return db.get_bind(), event_id
+
+    def stage(self, db: Session, event_id: int, changes: dict) -> dict:
+        """暂存部分更新，返回该事件当前全部未落盘的字段"""
+        with self._lock:
+            key = self._key(db, event_id)
+            pending = self._pending.setdefault(key, {})
+            # updated_at 取暂存时间，响应和最终落盘的值一致
+            pending.update(changes, updated_at=datetime.utcnow())
+            self._first_staged.setdefault(key, time.monotonic())
+            self.counters["staged"] += 1
+            return dict(pending)
+
+    def pending(self, db: Session, event_id: int) -> dict:
+        key = self._key(db, event_id)
+        with self._lock:
+            failed = self._failed.get(key)
+            return {
+                **(failed[0] if failed else {}),
+                **self._inflight.get(key, {}),
+                **self._pending.get(key, {}),
+            }
+
+    def discard(self, db: Session, event_id: int) -> None:
+        key = self._key(db, event_id)
+        with self._lock:
+            self._pending.pop(key, None)
+            self._first_staged.pop(key, None)
+            self._inflight.pop(key, None)
+            self._failures.pop(key, None)
+            self._failed.pop(key, None)
+
+    def overlay(self, db: Session, db_event: CalendarEvent) -> CalendarEvent:
+        """把未落盘的更新叠加到查询结果上，保证读到自己刚写的内容"""
+        changes = self.pending(db, db_event.id)
+        if changes:
+            # 脱离会话后再改属性，避免被当作脏数据提交
+            db.expunge(db_event)
+            for field, value in changes.items():
+                setattr(db_event, field, value)
+        return db_event
+
+    def ensure_saved(self, db: Session, event_id: int) -> None:
+        """
+        同步重试该事件停止后台重试的更新。
+        仍然失败时更新继续保留，抛出 WriteFailedError。
+        """
+        key = self._key(db, event_id)
+        with self._flush_lock:
+            with self._lock:
+                failed = self._failed.pop(key, None)
+            if failed is None:
+                return
+            changes = failed[0]
+            try:
+                self._write(key[0], {event_id: changes})
+            except Exception as e:
+                with self._lock:
+                    self._failed[key] = (changes, e)
+                raise WriteFailedError(
+                    f"Earlier changes to event {event_id} could not be saved: {e}"
+                ) from e
+            self.counters["recovered"] += 1
+            logger.info("写缓冲重试事件 %s 的更新成功", event_id)
+
+    def _write(self, bind, batch: Dict[int, dict]) -> None:
+        db = Session(bind=bind)
+        try:
+            for event_id, changes in batch.items():
+                db.execute(
+                    update(CalendarEvent)
+                    .where(CalendarEvent.id == event_id)
+                    .values(**changes, **mask_update_values(changes))
+                )
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def flush(self, older_than: Optional[float] = None) -> int:
+        """
+        把暂存的更新写入数据库，返回本次写入的事件数。
+        older_than 为 None 时全部写入，否则只写入暂存时间超过该秒数的事件。
+        写入失败不会抛出异常，读取接口可以放心地在查询前调用。
+        """
+        with self._flush_lock:
+            now = time.monotonic()
+            with self._lock:
+                ready = [
+                    key
+                    for key, staged_at in self._first_staged.items()
+                    if older_than is None or now - staged_at >= older_than
+                ]
+                batch = {key: self._pending.pop(key) for key in ready}
+                for key in ready:
+                    del self._first_staged[key]
+                self._inflight.update(batch)
+
+            if not batch:
+                return 0
+
+            # 每个数据库一个事务
+            groups: Dict[Hashable, Dict[int, dict]] = {}
+            for (bind, event_id), changes in batch.items():
+                groups.setdefault(bind, {})[event_id] = changes
+
+            failed = {}
+            for bind, group in groups.items():
+                try:
+                    self._write(bind, group)
+                except Exception:
+                    # 整批失败时逐个事件重试，只让出错的事件计入失败次数
+                    for event_id, changes in group.items():
+                        try:
+                            self._write(bind, {event_id: changes})
+                        except Exception as e:
+                            failed[(bind, event_id)] = (changes, e)
+
+            written = 0
+            with self._lock:
+                for key in batch:
+                    if self._inflight.pop(key, None) is None:
+                        # 写入期间事件被删除，失败的更新也不再放回
+                        failed.pop(key, None)
+                    elif key not in failed:
+                        self._failures.pop(key, None)
+                        written += 1
+                for key, (changes, error) in failed.items():
+                    self.counters["write_errors"] += 1
+                    # 放回缓冲区，期间新暂存的值优先
+                    changes = {**changes, **self._pending.get(key, {})}
+                    attempts = self._failures.get(key, 0) + 1
+                    if attempts >= MAX_FLUSH_ATTEMPTS:
+                        self._failures.pop(key, None)
+                        self._pending.pop(key, None)
+                        self._first_staged.pop(key, None)
+                        self._failed[key] = (changes, error)
+                        self.counters["failed_writes"] += 1
+                        logger.error(
+                            "写缓冲写入事件 %s 已失败 %s 次，停止后台重试，"
+                            "下次读取或更新该事件时再重试: %s",
+                            key[1],
+                            attempts,
+                            error,
+                        )
+                        continue
+                    self._failures[key] = attempts
+                    logger.warning(
+                        "写缓冲写入事件 %s 失败（第 %s 次）: %s",
+                        key[1],
+                        attempts,
+                        error,
+                    )
+                    self._pending[key] = changes
+                    self._first_staged.setdefault(key, now)
+            self.counters["flushed"] += written
+            return written
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.window / 2):
+            self.flush(older_than=self.window)
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="event-write-buffer", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """停止后台线程，并把剩余更新全部落盘"""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+
+write_buffer = WriteBuffer()
@@ -1,14 +1,25 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from .api import calendar
+from .core.admission import AdmissionMiddleware, admission_counters
+from .core.availability import ensure_availability_index
 from .core.database import engine
+from .core.encoding import CompressionMiddleware
+from .core.maintenance import configure_storage, ensure_autoincrement, maintenance
+from .core.write_buffer import write_buffer
 from .models.calendar import Base
 
 # 创建数据库表
 Base.metadata.create_all(bind=engine)
+ensure_availability_index(engine)
+ensure_autoincrement(engine)
+configure_storage(engine)
 
 app = FastAPI(title="AgentCalendar API", version="1.0.0")
 
+# 请求准入控制：限流和高成本请求并发上限，放在 CORS 内侧使拒绝响应也带 CORS 头
+app.add_middleware(AdmissionMiddleware)
+
 # CORS 设置
 app.add_middleware(
     CORSMiddleware,
@@ -18,6 +29,32 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 按 Accept-Encoding 协商 br / gzip 压缩
+app.add_middleware(CompressionMiddleware)
+
+
+# 单元格编辑的写缓冲：启动时开始后台合并，关闭时把剩余更新全部落盘
+@app.on_event("startup")
+def start_write_buffer():
+    write_buffer.start()
+
+
+@app.on_event("shutdown")
+def stop_write_buffer():
+    write_buffer.stop()
+
+
+# 定期增量压缩，回收删除和归档留下的空闲页
+@app.on_event("startup")
+def start_maintenance():
+    maintenance.start()
+
+
+@app.on_event("shutdown")
+def stop_maintenance():
+    maintenance.stop()
+
+
 # 包含路由
 app.include_router(calendar.router, prefix="/api/v1", tags=["calendar"])
 
@@ -25,3 +62,13 @@ app.include_router(calendar.router, prefix="/api/v1", tags=["calendar"])
 @app.get("/")
 def read_root():
     return {"message": "AgentCalendar API is running!"}
+
+
+@app.get("/admission")
+def read_admission_counters():
+    return dict(admission_counters)
+
+
+@app.get("/write-buffer")
+def read_write_buffer_counters():
+    return dict(write_buffer.counters)
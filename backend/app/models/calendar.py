@@ -1,10 +1,57 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean, Float
+from sqlalchemy import (
+    Column,
+    Integer,
+    String,
+    DateTime,
+    Text,
+    Boolean,
+    Float,
+    Index,
+    LargeBinary,
+    event,
+)
 from datetime import datetime
 from ..core.database import Base
 
+# 17 个一小时的时间段，第 i 个对应占用位图的第 i 位（7:00-8:00 为第 0 位）
+SLOT_FIELDS = [
+    "morning_7_8",
+    "morning_8_9",
+    "morning_9_10",
+    "morning_10_11",
+    "morning_11_12",
+    "afternoon_12_13",
+    "afternoon_13_14",
+    "afternoon_14_15",
+    "afternoon_15_16",
+    "afternoon_16_17",
+    "afternoon_17_18",
+    "evening_18_19",
+    "evening_19_20",
+    "evening_20_21",
+    "evening_21_22",
+    "evening_22_23",
+    "evening_23_24",
+]
+SLOT_BITS = {field: 1 << i for i, field in enumerate(SLOT_FIELDS)}
+FULL_MASK = (1 << len(SLOT_FIELDS)) - 1
+FIRST_SLOT_HOUR = 7
+
+# 完成状态字段覆盖的时间段位
+SESSION_MASKS = {
+    "morning_completed": sum(SLOT_BITS[f] for f in SLOT_FIELDS[0:5]),
+    "afternoon_completed": sum(SLOT_BITS[f] for f in SLOT_FIELDS[5:11]),
+    "evening_completed": sum(SLOT_BITS[f] for f in SLOT_FIELDS[11:17]),
+}
+
 
 class CalendarEvent(Base):
     __tablename__ = "calendar_events"
+    __table_args__ = (
+        Index("ix_calendar_events_date_busy", "date", "busy_mask"),
+        # id 不复用：归档表以原 id 为主键，复用会和已归档的事件冲突
+        {"sqlite_autoincrement": True},
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     date = Column(DateTime, nullable=False)
@@ -37,6 +84,10 @@ class CalendarEvent(Base):
     afternoon_completed = Column(Boolean, default=False)
     evening_completed = Column(Boolean, default=False)
 
+    # 位图索引：有内容的时间段 / 已完成的时间段，写入时维护
+    busy_mask = Column(Integer, nullable=False, default=0)
+    completed_mask = Column(Integer, nullable=False, default=0)
+
     # 统计字段
     productivity_score = Column(Float, default=0.0)
     notes = Column(Text, nullable=True)
@@ -45,6 +96,81 @@ class CalendarEvent(Base):
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
 
+class ArchivedEvent(Base):
+    """归档的历史事件，整行序列化后压缩存放，不占用热表"""
+
+    __tablename__ = "calendar_events_archive"
+
+    id = Column(Integer, primary_key=True)
+    date = Column(DateTime, nullable=False, index=True)
+    category = Column(String(100), nullable=True)
+    payload = Column(LargeBinary, nullable=False)  # zlib 压缩的 JSON
+
+    archived_at = Column(DateTime, default=datetime.utcnow)
+
+
+def slot_is_busy(value) -> bool:
+    return value is not None and value.strip() != ""
+
+
+def compute_masks(values) -> tuple:
+    """根据完整的一行数据计算 (busy_mask, completed_mask)"""
+    busy = 0
+    for field, bit in SLOT_BITS.items():
+        if slot_is_busy(values.get(field)):
+            busy |= bit
+    completed = 0
+    for field, mask in SESSION_MASKS.items():
+        if values.get(field):
+            completed |= mask
+    return busy, completed
+
+
+def _patch_bits(column, touched: int, set_bits: int):
+    return column.op("&")(FULL_MASK & ~touched).op("|")(set_bits)
+
+
+def mask_update_values(changes: dict) -> dict:
+    """
+    部分更新对应的位图 SQL 表达式，只依赖变更的字段，
+    可以和变更列放在同一条 UPDATE 里
+    """
+    values = {}
+
+    touched = set_bits = 0
+    for field, bit in SLOT_BITS.items():
+        if field in changes:
+            touched |= bit
+            if slot_is_busy(changes[field]):
+                set_bits |= bit
+    if touched:
+        values["busy_mask"] = _patch_bits(CalendarEvent.busy_mask, touched, set_bits)
+
+    touched = set_bits = 0
+    for field, mask in SESSION_MASKS.items():
+        if field in changes:
+            touched |= mask
+            if changes[field]:
+                set_bits |= mask
+    if touched:
+        values["completed_mask"] = _patch_bits(
+            CalendarEvent.completed_mask, touched, set_bits
+        )
+
+    return values
+
+
+@event.listens_for(CalendarEvent, "before_insert")
+@event.listens_for(CalendarEvent, "before_update")
+def _update_masks(mapper, connection, target):
+    target.busy_mask, target.completed_mask = compute_masks(
+        {
+            field: getattr(target, field)
+            for field in list(SLOT_BITS) + list(SESSION_MASKS)
+        }
+    )
+
+
 class Task(Base):
     __tablename__ = "tasks"
 
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+响应编码基准测试 - 对比各编码/压缩组合的传输字节数与编码耗时
+
+用法（在 backend 目录下）:
+  python -m benchmarks.response_encoding [天数]
+"""
+
+import gzip
+import sys
+import time
+from datetime import datetime, timedelta
+
+from app.core.encoding import brotli, encode_json, encode_msgpack, msgpack
+
+SLOTS = ["morning_9_10", "afternoon_14_15", "evening_20_21"]
+NULL_FIELDS = [
+    "morning_7_8", "morning_8_9", "morning_10_11", "morning_11_12",
+    "afternoon_12_13", "afternoon_13_14", "afternoon_15_16", "afternoon_16_17",
+    "afternoon_17_18", "evening_18_19", "evening_19_20", "evening_21_22",
+    "evening_22_23", "evening_23_24", "notes",
+]  # fmt: skip
+REPEAT = 5
+
+
+def make_rows(days):
+    base = datetime(2025, 1, 1)
+    rows = []
+    for i in range(days):
+        day = base + timedelta(days=i)
+        row = {
+            "id": i + 1,
+            "date": day.isoformat(),
+            "title": f"日程 {day.strftime('%m-%d')}",
+            "category": "工作",
+            "morning_completed": i % 2 == 0,
+            "afternoon_completed": False,
+            "evening_completed": i % 3 == 0,
+            "productivity_score": 7.5,
+            "created_at": day.isoformat(),
+            "updated_at": day.isoformat(),
+        }
+        row.update({field: None for field in NULL_FIELDS})
+        row.update({slot: "项目开发 + 代码评审" for slot in SLOTS})
+        rows.append(row)
+    return rows
+
+
+def timed(fn):
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        result = fn()
+    return result, (time.perf_counter() - start) / REPEAT * 1000
+
+
+def main():
+    days = int(sys.argv[1]) if len(sys.argv) > 1 else 365
+    rows = make_rows(days)
+
+    formats = {"json": lambda: b"".join(encode_json(rows))}
+    if msgpack is not None:
+        formats["msgpack"] = lambda: b"".join(encode_msgpack(rows, len(rows)))
+
+    compressions = {"identity": lambda body: body, "gzip": gzip.compress}
+    if brotli is not None:
+        compressions["br"] = lambda body: brotli.compress(body, quality=5)
+
+    print(f"🧪 响应编码基准测试（{days} 个事件）")
+    print("=" * 60)
+    print(f"{'格式':<10}{'压缩':<10}{'字节数':>12}{'编码 ms':>12}{'压缩 ms':>12}")
+    for format_name, encode in formats.items():
+        body, encode_ms = timed(encode)
+        for compression_name, compress in compressions.items():
+            wire, compress_ms = timed(lambda: compress(body))
+            print(
+                f"{format_name:<10}{compression_name:<10}{len(wire):>12}"
+                f"{encode_ms:>12.2f}{compress_ms:>12.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+周视图翻页基准测试 - 对比每次翻页单独请求与使用 prefetch 窗口的请求次数和耗时
+
+用法（在 backend 目录下）:
+  python -m benchmarks.week_navigation
+"""
+
+import os
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.api import calendar
+from app.core.database import get_db
+from app.models.calendar import Base, CalendarEvent
+
+START = date(2024, 12, 2)
+WEEKS = 60  # 连续向后翻页的次数，跨越 2025 年的年末和年初
+
+
+def make_client(path):
+    engine = create_engine(
+        f"sqlite:///{path}", connect_args={"check_same_thread": False}
+    )
+    Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(bind=engine)
+
+    db = session_factory()
+    day = START - timedelta(days=14)
+    while day <= START + timedelta(weeks=WEEKS + 2):
+        # 每天一个事件，放在当天最后时刻，验证结束日当天的事件不会被漏掉
+        db.add(
+            CalendarEvent(date=datetime.combine(day, datetime.max.time()), title="t")
+        )
+        day += timedelta(days=1)
+    db.commit()
+    db.close()
+
+    def override_get_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app = FastAPI()
+    app.include_router(calendar.router, prefix="/api/v1")
+    app.dependency_overrides[get_db] = override_get_db
+    return TestClient(app)
+
+
+def weeks():
+    for i in range(WEEKS):
+        iso = (START + timedelta(weeks=i)).isocalendar()
+        yield iso[0], iso[1]
+
+
+def navigate_plain(client):
+    requests = 0
+    for year, week in weeks():
+        data = client.get(f"/api/v1/week/{year}/{week}").json()
+        requests += 1
+        assert len(data["events"]) == 7, (year, week, len(data["events"]))
+    return requests
+
+
+def navigate_prefetch(client):
+    requests = 0
+    cached = None  # (window_start, window_end, events)
+    for year, week in weeks():
+        start, end = calendar.iso_week_range(year, week)
+        if cached is None or not (cached[0] <= start and end <= cached[1]):
+            data = client.get(f"/api/v1/week/{year}/{week}?prefetch=true").json()
+            requests += 1
+            cached = (
+                date.fromisoformat(data["window_start"]),
+                date.fromisoformat(data["window_end"]),
+                data["events"],
+            )
+        events = [
+            e for e in cached[2] if start <= date.fromisoformat(e["date"][:10]) <= end
+        ]
+        assert len(events) == 7, (year, week, len(events))
+    return requests
+
+
+def bench(name, client, navigate):
+    start = time.perf_counter()
+    requests = navigate(client)
+    elapsed = (time.perf_counter() - start) * 1000
+    print(
+        f"{name:<10} 翻页 {WEEKS} 次  请求 {requests:>3} 次  "
+        f"总耗时 {elapsed:8.2f} ms  平均每页 {elapsed / WEEKS:6.2f} ms"
+    )
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        client = make_client(os.path.join(tmp, "bench.db"))
+        print("🧪 周视图翻页基准测试")
+        print("=" * 60)
+        bench("plain", client, navigate_plain)
+        bench("prefetch", client, navigate_prefetch)
+
+
+if __name__ == "__main__":
+    main()
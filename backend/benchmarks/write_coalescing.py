@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+写缓冲基准测试 - 模拟在表格中连续打字，对比直接提交与写缓冲合并的提交次数
+
+用法（在 backend 目录下）:
+  python -m benchmarks.write_coalescing
+"""
+
+import os
+import tempfile
+import time
+from datetime import datetime
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.core.write_buffer import WriteBuffer
+from app.models.calendar import Base, CalendarEvent
+
+SLOTS = ["morning_9_10", "morning_10_11", "afternoon_14_15", "evening_20_21"]
+TEXT = "整理周报并同步给团队"
+KEY_INTERVAL = 0.02  # 每次按键间隔，约 50 次/秒
+
+
+def make_session_factory(path):
+    engine = create_engine(
+        f"sqlite:///{path}", connect_args={"check_same_thread": False}
+    )
+    Base.metadata.create_all(bind=engine)
+    counter = {"commits": 0}
+
+    @event.listens_for(engine, "commit")
+    def count_commit(conn):
+        counter["commits"] += 1
+
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine), counter
+
+
+def seed(session_factory):
+    db = session_factory()
+    db_event = CalendarEvent(date=datetime(2025, 1, 6), title="基准测试")
+    db.add(db_event)
+    db.commit()
+    event_id = db_event.id
+    db.close()
+    return event_id
+
+
+def keystrokes():
+    for slot in SLOTS:
+        for i in range(1, len(TEXT) + 1):
+            yield slot, TEXT[:i]
+
+
+def run_direct(session_factory, event_id):
+    """原来的更新路径：查询、整行提交、再 refresh"""
+    for slot, value in keystrokes():
+        db = session_factory()
+        db_event = db.query(CalendarEvent).filter(CalendarEvent.id == event_id).first()
+        setattr(db_event, slot, value)
+        db_event.updated_at = datetime.utcnow()
+        db.commit()
+        db.refresh(db_event)
+        db.close()
+        time.sleep(KEY_INTERVAL)
+
+
+def run_buffered(session_factory, event_id):
+    buffer = WriteBuffer()
+    buffer.start()
+    for slot, value in keystrokes():
+        db = session_factory()
+        db_event = db.query(CalendarEvent).filter(CalendarEvent.id == event_id).first()
+        buffer.stage(db, event_id, {slot: value})
+        buffer.overlay(db, db_event)
+        assert getattr(db_event, slot) == value
+        db.close()
+        time.sleep(KEY_INTERVAL)
+    buffer.stop()
+
+
+def bench(name, runner):
+    with tempfile.TemporaryDirectory() as tmp:
+        session_factory, counter = make_session_factory(os.path.join(tmp, "bench.db"))
+        event_id = seed(session_factory)
+        counter["commits"] = 0
+
+        start = time.perf_counter()
+        runner(session_factory, event_id)
+        elapsed = time.perf_counter() - start
+
+        # 确认最终结果一致
+        db = session_factory()
+        db_event = db.query(CalendarEvent).filter(CalendarEvent.id == event_id).first()
+        assert all(getattr(db_event, slot) == TEXT for slot in SLOTS)
+        db.close()
+
+    edits = len(SLOTS) * len(TEXT)
+    print(
+        f"{name:<10} 编辑 {edits:>4} 次  提交 {counter['commits']:>4} 次  "
+        f"耗时 {elapsed:6.2f}s  提交/秒 {counter['commits'] / elapsed:7.1f}"
+    )
+
+
+def main():
+    print("🧪 写缓冲基准测试")
+    print("=" * 60)
+    bench("direct", run_direct)
+    bench("buffered", run_buffered)
+
+
+if __name__ == "__main__":
+    main()
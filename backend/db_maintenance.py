@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+AgentCalendar 数据库维护脚本
+服务运行期间也可以安全执行
+
+用法:
+  python db_maintenance.py backup [目标文件]     # 在线备份
+  python db_maintenance.py vacuum                # 回收空闲页
+  python db_maintenance.py archive --days 365    # 归档 365 天前的事件
+  python db_maintenance.py archive --before 2024-01-01
+
+归档的事件只读，截止日期应早于任何仍可能被编辑的日期；
+最近一分钟内更新过的事件会被跳过，留到下次归档。
+"""
+
+import argparse
+import os
+from datetime import date, datetime, timedelta
+
+from app.core.availability import ensure_availability_index
+from app.core.database import SessionLocal, engine
+from app.core.maintenance import (
+    archive_events,
+    backup_database,
+    configure_storage,
+    ensure_autoincrement,
+    incremental_vacuum,
+)
+from app.models.calendar import Base
+
+
+def run_backup(dest):
+    if dest is None:
+        os.makedirs("backups", exist_ok=True)
+        dest = os.path.join(
+            "backups", f"calendar-{datetime.now().strftime('%Y%m%d-%H%M%S')}.db"
+        )
+
+    def progress(status, remaining, total):
+        done = total - remaining
+        print(f"\r   已复制 {done}/{total} 页", end="", flush=True)
+
+    print(f"💾 正在备份到 {dest} ...")
+    backup_database(dest, progress=progress)
+    print(f"\n✅ 备份完成: {dest}")
+
+
+def run_vacuum():
+    print("🧹 正在回收空闲页...")
+    freed = incremental_vacuum()
+    print(f"✅ 回收了 {freed} 页")
+
+
+def run_archive(before):
+    print(f"📦 正在归档 {before} 之前的事件...")
+    db = SessionLocal()
+    try:
+        moved = archive_events(db, before)
+    finally:
+        db.close()
+    freed = incremental_vacuum()
+    print(f"✅ 归档了 {moved} 个事件，回收了 {freed} 页")
+    print("   归档事件可通过 GET /api/v1/events?include_archived=true 查询（只读）")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AgentCalendar 数据库维护")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    backup = commands.add_parser("backup", help="在线备份数据库")
+    backup.add_argument("dest", nargs="?", help="目标文件，默认 backups/ 下按时间命名")
+
+    commands.add_parser("vacuum", help="回收删除事件留下的空闲页")
+
+    archive = commands.add_parser("archive", help="把历史事件移入压缩归档")
+    cutoff = archive.add_mutually_exclusive_group(required=True)
+    cutoff.add_argument("--before", type=date.fromisoformat, help="截止日期 YYYY-MM-DD")
+    cutoff.add_argument("--days", type=int, help="归档多少天之前的事件")
+
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    ensure_availability_index(engine)
+    ensure_autoincrement(engine)
+    configure_storage(engine)
+
+    if args.command == "backup":
+        run_backup(args.dest)
+    elif args.command == "vacuum":
+        run_vacuum()
+    else:
+        before = args.before or date.today() - timedelta(days=args.days)
+        run_archive(before)
+
+
+if __name__ == "__main__":
+    main()
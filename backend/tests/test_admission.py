@@ -0,0 +1,203 @@
+import asyncio
+
+import pytest
+
+from app.core.admission import (
+    ARCHIVE_COST,
+    DAYS_PER_COST,
+    EXPENSIVE_COST,
+    UNBOUNDED_COST,
+    AdmissionMiddleware,
+    admission_counters,
+    client_key,
+    estimate_cost,
+)
+
+
+class Backend:
+    """下游应用：/events 请求一直占用并发名额，直到 release 被设置"""
+
+    def __init__(self):
+        self.release = asyncio.Event()
+
+    async def __call__(self, scope, receive, send):
+        if scope["path"].endswith("/events"):
+            await self.release.wait()
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+
+async def request(app, path, query=b"", client="10.0.0.1", headers=()):
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": path,
+        "query_string": query,
+        "headers": [(k.lower().encode(), v.encode()) for k, v in headers],
+        "client": (client, 50000),
+    }
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    await app(scope, receive, send)
+    start = messages[0]
+    return start["status"], {k.decode(): v.decode() for k, v in start["headers"]}
+
+
+@pytest.fixture
+def counters():
+    """本测试内计数器的增量"""
+    before = admission_counters.copy()
+    return lambda: admission_counters - before
+
+
+@pytest.mark.parametrize(
+    "method, route, query, expected",
+    [
+        ("PUT", "PUT /api/v1/events/{id}", b"", 1.0),
+        ("GET", "GET /api/v1/events/{id}", b"", 1.0),
+        ("GET", "GET /api/v1/week/{id}/{id}", b"prefetch=true", 1.0),
+        ("GET", "GET /api/v1/stats/{id}/{id}", b"", EXPENSIVE_COST),
+        ("GET", "GET /api/v1/events", b"", UNBOUNDED_COST),
+        ("GET", "GET /api/v1/events", b"start_date=2026-01-01", UNBOUNDED_COST),
+        (
+            "GET",
+            "GET /api/v1/events",
+            b"start_date=2026-01-01&end_date=bad",
+            UNBOUNDED_COST,
+        ),
+        ("GET", "GET /api/v1/events", b"start_date=2026-01-01&end_date=2026-01-07", 2),
+        (
+            "GET",
+            "GET /api/v1/availability",
+            b"start_date=2026-01-01&end_date=2026-12-31",
+            1 + -(-365 // DAYS_PER_COST),
+        ),
+        (
+            "GET",
+            "GET /api/v1/availability",
+            b"start_date=2020-01-01&end_date=2026-12-31",
+            UNBOUNDED_COST,
+        ),
+        (
+            "GET",
+            "GET /api/v1/events",
+            b"include_archived=true",
+            UNBOUNDED_COST + ARCHIVE_COST,
+        ),
+        (
+            "GET",
+            "GET /api/v1/events",
+            b"start_date=2026-01-01&end_date=2026-01-07&include_archived=1",
+            2 + ARCHIVE_COST,
+        ),
+        ("GET", "GET /api/v1/events", b"include_archived=false", UNBOUNDED_COST),
+    ],
+)
+def test_estimate_cost(method, route, query, expected):
+    assert estimate_cost(method, route, query) == expected
+
+
+@pytest.mark.parametrize(
+    "client, forwarded, expected",
+    [
+        ("10.0.0.1", None, "10.0.0.1"),
+        # 不受信任的客户端自带的 X-Forwarded-For 不采用
+        ("10.0.0.1", "1.2.3.4", "10.0.0.1"),
+        ("127.0.0.1", None, "127.0.0.1"),
+        ("127.0.0.1", "192.168.1.20", "192.168.1.20"),
+        # 左侧的值可能是客户端伪造的，取最右侧的不受信任地址
+        ("127.0.0.1", "6.6.6.6, 192.168.1.20", "192.168.1.20"),
+        ("127.0.0.1", "192.168.1.20, 127.0.0.1", "192.168.1.20"),
+    ],
+)
+def test_client_key(client, forwarded, expected):
+    headers = [(b"x-forwarded-for", forwarded.encode())] if forwarded else []
+    scope = {"client": (client, 50000), "headers": headers}
+
+    assert client_key(scope, {"127.0.0.1", "::1"}) == expected
+
+
+def test_rate_limit_returns_429_with_retry_after(counters):
+    app = AdmissionMiddleware(Backend(), rate=1, burst=2)
+
+    async def run():
+        return [await request(app, "/api/v1/events/1") for _ in range(3)]
+
+    responses = asyncio.run(run())
+
+    assert [status for status, _ in responses] == [200, 200, 429]
+    assert responses[2][1]["retry-after"] == "1"
+    assert counters()["admitted"] == 2
+    assert counters()["rejected_rate_limited"] == 1
+
+
+def test_clients_behind_proxy_get_separate_buckets():
+    app = AdmissionMiddleware(Backend(), rate=1, burst=1)
+
+    async def run(forwarded):
+        return (
+            await request(
+                app,
+                "/api/v1/events/1",
+                client="127.0.0.1",
+                headers=[("X-Forwarded-For", forwarded)],
+            )
+        )[0]
+
+    # 同一个代理后面的两个用户互不影响，同一个用户仍受限
+    assert asyncio.run(run("192.168.1.20")) == 200
+    assert asyncio.run(run("192.168.1.21")) == 200
+    assert asyncio.run(run("192.168.1.20")) == 429
+
+
+def test_queue_full_returns_503(counters):
+    backend = Backend()
+    app = AdmissionMiddleware(
+        backend, burst=1000, concurrency=1, queue_size=1, queue_timeout=5
+    )
+
+    async def run():
+        running = asyncio.create_task(request(app, "/api/v1/events"))
+        await asyncio.sleep(0.01)
+        queued = asyncio.create_task(request(app, "/api/v1/events", client="10.0.0.2"))
+        await asyncio.sleep(0.01)
+        rejected = await request(app, "/api/v1/events", client="10.0.0.3")
+        backend.release.set()
+        return await running, await queued, rejected
+
+    running, queued, rejected = asyncio.run(run())
+
+    assert (running[0], queued[0], rejected[0]) == (200, 200, 503)
+    assert rejected[1]["retry-after"] == "5"
+    assert counters()["rejected_queue_full"] == 1
+    assert counters()["queued"] == 1
+    assert counters()["admitted_expensive"] == 2
+
+
+def test_queue_timeout_returns_503(counters):
+    backend = Backend()
+    app = AdmissionMiddleware(
+        backend, burst=1000, concurrency=1, queue_size=4, queue_timeout=0.05
+    )
+
+    async def run():
+        running = asyncio.create_task(request(app, "/api/v1/events"))
+        await asyncio.sleep(0.01)
+        timed_out = await request(app, "/api/v1/events", client="10.0.0.2")
+        # 超时后不占用名额，廉价请求不受影响
+        cheap = await request(app, "/api/v1/events/1", client="10.0.0.2")
+        backend.release.set()
+        return await running, timed_out, cheap
+
+    running, timed_out, cheap = asyncio.run(run())
+
+    assert (running[0], timed_out[0], cheap[0]) == (200, 503, 200)
+    assert timed_out[1]["retry-after"] == "1"
+    assert counters()["rejected_queue_timeout"] == 1
+    assert counters()["admitted"] == 2
@@ -0,0 +1,211 @@
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from app.core.availability import (
+    ensure_availability_index,
+    find_free_slots,
+    free_runs,
+)
+from app.core.write_buffer import write_buffer
+from app.models.calendar import (
+    FULL_MASK,
+    SESSION_MASKS,
+    SLOT_BITS,
+    SLOT_FIELDS,
+    CalendarEvent,
+)
+
+
+@pytest.fixture
+def add_event(session_factory):
+    def add(day, category=None, **fields):
+        db = session_factory()
+        db_event = CalendarEvent(date=day, title="t", category=category, **fields)
+        db.add(db_event)
+        db.commit()
+        event_id = db_event.id
+        db.close()
+        return event_id
+
+    return add
+
+
+@pytest.fixture
+def masks(session_factory):
+    def read(event_id):
+        db = session_factory()
+        row = db.get(CalendarEvent, event_id)
+        db.close()
+        return row.busy_mask, row.completed_mask
+
+    return read
+
+
+def test_put_sets_and_clears_busy_bits(client, add_event, masks):
+    event_id = add_event(datetime(2026, 1, 5), morning_7_8="早会")
+    assert masks(event_id) == (SLOT_BITS["morning_7_8"], 0)
+
+    client.put(f"/api/v1/events/{event_id}", json={"evening_23_24": "读书"})
+    write_buffer.flush()
+    assert masks(event_id)[0] == SLOT_BITS["morning_7_8"] | SLOT_BITS["evening_23_24"]
+
+    # 清空时间段（空白也算空闲）只清除对应的位
+    client.put(
+        f"/api/v1/events/{event_id}", json={"morning_7_8": "", "evening_23_24": "  "}
+    )
+    write_buffer.flush()
+    assert masks(event_id) == (0, 0)
+
+
+def test_put_toggles_completed_bits(client, add_event, masks):
+    event_id = add_event(datetime(2026, 1, 5), afternoon_completed=True)
+    assert masks(event_id)[1] == SESSION_MASKS["afternoon_completed"]
+
+    client.put(
+        f"/api/v1/events/{event_id}",
+        json={"morning_completed": True, "afternoon_completed": False},
+    )
+    write_buffer.flush()
+    assert masks(event_id)[1] == SESSION_MASKS["morning_completed"]
+
+    client.put(f"/api/v1/events/{event_id}", json={"evening_completed": True})
+    write_buffer.flush()
+    assert masks(event_id)[1] == (
+        SESSION_MASKS["morning_completed"] | SESSION_MASKS["evening_completed"]
+    )
+
+
+def test_ensure_availability_index_backfills_old_schema(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    slot_columns = ", ".join(f"{field} VARCHAR(255)" for field in SLOT_FIELDS)
+    with engine.begin() as conn:
+        # 加位图列之前的表结构
+        conn.execute(
+            text(
+                "CREATE TABLE calendar_events ("
+                "id INTEGER PRIMARY KEY, date DATETIME NOT NULL, "
+                "title VARCHAR(255) NOT NULL, category VARCHAR(100), "
+                f"{slot_columns}, morning_completed BOOLEAN, "
+                "afternoon_completed BOOLEAN, evening_completed BOOLEAN, "
+                "productivity_score FLOAT, notes TEXT, "
+                "created_at DATETIME, updated_at DATETIME)"
+            )
+        )
+        conn.execute(
+            text(
+                "INSERT INTO calendar_events "
+                "(id, date, title, morning_9_10, evening_22_23, evening_completed) "
+                "VALUES (1, '2026-01-05 00:00:00', 'a', '写周报', '读书', 1), "
+                "(2, '2026-01-06 00:00:00', 'b', ' ', NULL, 0)"
+            )
+        )
+
+    ensure_availability_index(engine)
+    # 再次执行不会重复迁移
+    ensure_availability_index(engine)
+
+    with engine.connect() as conn:
+        rows = conn.execute(
+            text(
+                "SELECT id, busy_mask, completed_mask FROM calendar_events ORDER BY id"
+            )
+        ).all()
+        indexes = conn.execute(
+            text("SELECT name FROM sqlite_master WHERE type = 'index'")
+        ).scalars()
+        assert "ix_calendar_events_date_busy" in list(indexes)
+    engine.dispose()
+
+    assert rows == [
+        (
+            1,
+            SLOT_BITS["morning_9_10"] | SLOT_BITS["evening_22_23"],
+            SESSION_MASKS["evening_completed"],
+        ),
+        (2, 0, 0),
+    ]
+
+
+@pytest.mark.parametrize(
+    "busy, length, expected",
+    [
+        (0, 1, FULL_MASK),
+        (0, len(SLOT_FIELDS), 1),
+        (FULL_MASK, 1, 0),
+        # 只有第一个时间段空闲
+        (FULL_MASK & ~1, 1, 1),
+        (FULL_MASK & ~1, 2, 0),
+        # 只有最后两个时间段空闲
+        (FULL_MASK >> 2, 2, 1 << 15),
+        (FULL_MASK >> 2, 3, 0),
+        # 中间占用，两端各剩 3 个
+        (FULL_MASK & ~0b111 & ~(0b111 << 14), 3, 1 | 1 << 14),
+    ],
+)
+def test_free_runs_at_day_edges(busy, length, expected):
+    assert free_runs(busy, length) == expected
+
+
+def test_find_free_slots_reports_hours_at_day_edges():
+    day = date(2026, 1, 5)
+    # 第一个和最后两个时间段之外都被占用
+    masks = {day: FULL_MASK & ~1 & ~(0b11 << 15)}
+
+    one = find_free_slots(masks, day, day, length=1)
+    two = find_free_slots(masks, day, day, length=2)
+
+    assert [(s["start_hour"], s["end_hour"]) for s in one] == [
+        (7, 8),
+        (22, 23),
+        (23, 24),
+    ]
+    assert two == [
+        {
+            "date": "2026-01-05",
+            "start_hour": 22,
+            "end_hour": 24,
+            "slots": ["evening_22_23", "evening_23_24"],
+        }
+    ]
+
+
+def test_find_free_slots_does_not_span_days():
+    first, second = date(2026, 1, 5), date(2026, 1, 6)
+    # 第一天只剩最后一小时，第二天只剩第一小时
+    masks = {first: FULL_MASK >> 1, second: FULL_MASK & ~1}
+
+    assert find_free_slots(masks, first, second, length=2) == []
+    assert len(find_free_slots(masks, first, second, length=1)) == 2
+
+
+def test_availability_intersects_calendars(client, add_event):
+    day = datetime(2026, 1, 5, 9)
+    busy_work = {field: "工作" for field in SLOT_FIELDS[:5]}
+    busy_home = {field: "家务" for field in SLOT_FIELDS[8:16]}
+    add_event(day, "work", **busy_work)
+    add_event(day, "home", **busy_home)
+    # 不在查询的日历里，不影响结果
+    add_event(day, "gym", **{field: "健身" for field in SLOT_FIELDS})
+
+    response = client.get(
+        "/api/v1/availability",
+        params={
+            "start_date": "2026-01-05",
+            "end_date": "2026-01-05",
+            "length": 3,
+            "calendars": ["work", "home"],
+        },
+    )
+
+    assert response.status_code == 200
+    slots = [(s["start_hour"], s["end_hour"]) for s in response.json()["slots"]]
+    # 12:00-15:00 两个日历都空闲；23:00-24:00 只有一小时，不够 3 小时
+    assert slots == [(12, 15)]
+
+    response = client.get(
+        "/api/v1/availability",
+        params={"start_date": "2026-01-05", "end_date": "2026-01-05", "length": 3},
+    )
+    assert response.json()["slots"] == []
@@ -0,0 +1,132 @@
+import gzip
+from datetime import datetime, timedelta
+
+import msgpack
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app.api import calendar
+from app.core.database import get_db
+from app.core.encoding import CompressionMiddleware
+from app.models.calendar import CalendarEvent
+
+
+@pytest.fixture
+def compressed_client(session_factory):
+    def override_get_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app = FastAPI()
+    app.include_router(calendar.router, prefix="/api/v1")
+    app.dependency_overrides[get_db] = override_get_db
+    app.add_middleware(CompressionMiddleware)
+    return TestClient(app)
+
+
+@pytest.fixture
+def seed(session_factory):
+    def add(count):
+        db = session_factory()
+        start = datetime(2026, 1, 5, 9)
+        for i in range(count):
+            db.add(
+                CalendarEvent(
+                    date=start + timedelta(hours=i),
+                    title=f"事件 {i}",
+                    morning_9_10="写周报",
+                )
+            )
+        db.commit()
+        db.close()
+
+    return add
+
+
+@pytest.fixture
+def selects(engine):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("SELECT"):
+            statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    yield statements
+    event.remove(engine, "before_cursor_execute", record)
+
+
+def test_small_streamed_response_is_not_compressed(compressed_client):
+    response = compressed_client.get(
+        "/api/v1/events", headers={"Accept-Encoding": "gzip"}
+    )
+
+    assert response.json() == []
+    assert "content-encoding" not in response.headers
+
+
+def test_large_streamed_response_is_compressed(compressed_client, seed):
+    seed(50)
+
+    response = compressed_client.get(
+        "/api/v1/events", headers={"Accept-Encoding": "gzip"}
+    )
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert len(response.json()) == 50
+
+
+def test_compressed_chunks_decode_to_full_body(compressed_client, seed):
+    seed(500)
+
+    with compressed_client.stream(
+        "GET", "/api/v1/events", headers={"Accept-Encoding": "gzip"}
+    ) as response:
+        raw = b"".join(response.iter_raw())
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert raw.startswith(b"\x1f\x8b")
+    assert len(gzip.decompress(raw)) > len(raw)
+
+
+def test_json_path_skips_count(client, seed, selects):
+    seed(3)
+
+    response = client.get("/api/v1/events")
+
+    assert len(response.json()) == 3
+    assert not any("count(" in statement for statement in selects)
+
+
+def test_msgpack_path_writes_count(client, seed, selects):
+    seed(3)
+
+    response = client.get("/api/v1/events", headers={"Accept": "application/x-msgpack"})
+
+    assert response.headers["content-type"] == "application/x-msgpack"
+    events = msgpack.unpackb(response.content)
+    assert [e["title"] for e in events] == ["事件 0", "事件 1", "事件 2"]
+    # 空时间段字段被省略
+    assert "morning_7_8" not in events[0]
+    assert any("count(" in statement for statement in selects)
+
+
+@pytest.mark.parametrize(
+    "accept, expected",
+    [
+        ("application/x-msgpack", "application/x-msgpack"),
+        ("application/json, application/x-msgpack;q=0.5", "application/json"),
+        ("application/x-msgpack;q=0", "application/json"),
+        ("application/x-msgpack;q=abc", "application/json"),
+        ("*/*", "application/json"),
+    ],
+)
+def test_accept_negotiation(client, accept, expected):
+    response = client.get("/api/v1/events", headers={"Accept": accept})
+
+    assert response.headers["content-type"] == expected
@@ -0,0 +1,113 @@
+import sqlite3
+import types
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from app.core import maintenance
+from app.core.maintenance import (
+    archive_events,
+    archived_events,
+    backup_database,
+    count_archived_events,
+)
+from app.models.calendar import CalendarEvent
+
+LONG_AGO = datetime(2020, 1, 1)
+
+
+@pytest.fixture
+def seed(session_factory):
+    def add(*days, updated_at=LONG_AGO):
+        db = session_factory()
+        for day in days:
+            db.add(
+                CalendarEvent(date=day, title=day.isoformat(), updated_at=updated_at)
+            )
+        db.commit()
+        db.close()
+
+    return add
+
+
+def test_archived_events_stream_in_date_order(session_factory, seed):
+    # id 顺序和日期顺序相反
+    seed(datetime(2024, 3, 1), datetime(2024, 2, 1), datetime(2024, 1, 1))
+    db = session_factory()
+    assert archive_events(db, date(2025, 1, 1)) == 3
+
+    rows = archived_events(db)
+    assert isinstance(rows, types.GeneratorType)
+    assert [row["title"] for row in rows] == [
+        "2024-01-01T00:00:00",
+        "2024-02-01T00:00:00",
+        "2024-03-01T00:00:00",
+    ]
+    assert count_archived_events(db, start_date=date(2024, 2, 1)) == 2
+    db.close()
+
+
+def test_archive_skips_recently_updated_events(session_factory, seed):
+    seed(datetime(2024, 1, 1))
+    seed(datetime(2024, 1, 2), updated_at=datetime.utcnow())
+    db = session_factory()
+
+    assert archive_events(db, date(2025, 1, 1)) == 1
+    assert [e.title for e in db.query(CalendarEvent)] == ["2024-01-02T00:00:00"]
+    db.close()
+
+
+def test_events_merge_archived_rows_by_date(client, session_factory, seed):
+    seed(datetime(2024, 1, 1), datetime(2024, 1, 3))
+    db = session_factory()
+    archive_events(db, date(2025, 1, 1))
+    db.close()
+    seed(datetime(2024, 1, 2), datetime(2024, 1, 4))
+
+    hot = client.get("/api/v1/events").json()
+    merged = client.get("/api/v1/events", params={"include_archived": True}).json()
+    ranged = client.get(
+        "/api/v1/events",
+        params={
+            "include_archived": True,
+            "start_date": "2024-01-02",
+            "end_date": "2024-01-03",
+        },
+    ).json()
+
+    assert [e["date"][:10] for e in hot] == ["2024-01-02", "2024-01-04"]
+    assert [e["date"][:10] for e in merged] == [
+        "2024-01-01",
+        "2024-01-02",
+        "2024-01-03",
+        "2024-01-04",
+    ]
+    assert [e["date"][:10] for e in ranged] == ["2024-01-02", "2024-01-03"]
+
+
+def test_backup_sleeps_between_steps(engine, session_factory, tmp_path, monkeypatch):
+    db = session_factory()
+    start = datetime(2024, 1, 1)
+    for i in range(300):
+        db.add(CalendarEvent(date=start + timedelta(days=i), title="x" * 200))
+    db.commit()
+    db.close()
+    sleeps = []
+    monkeypatch.setattr(maintenance._time, "sleep", sleeps.append)
+    steps = []
+
+    dest = tmp_path / "backup.db"
+    backup_database(
+        str(dest),
+        engine=engine,
+        pages=4,
+        sleep=0.01,
+        progress=lambda status, remaining, total: steps.append(remaining),
+    )
+
+    # 最后一步之后不再休眠
+    assert len(steps) > 1
+    assert sleeps == [0.01] * (len(steps) - 1)
+    copy = sqlite3.connect(dest)
+    assert copy.execute("SELECT COUNT(*) FROM calendar_events").fetchone() == (300,)
+    copy.close()
@@ -0,0 +1,130 @@
+from datetime import datetime
+
+import pytest
+
+from app.models.calendar import CalendarEvent
+
+
+@pytest.fixture
+def add_events(session_factory):
+    def add(*dates):
+        db = session_factory()
+        for value in dates:
+            db.add(CalendarEvent(date=value, title=value.isoformat()))
+        db.commit()
+        db.close()
+
+    return add
+
+
+def event_dates(response):
+    return [event["date"] for event in response.json()["events"]]
+
+
+@pytest.mark.parametrize(
+    "year, week, start_date, end_date",
+    [
+        (2020, 53, "2020-12-28", "2021-01-03"),
+        (2021, 1, "2021-01-04", "2021-01-10"),
+        (2025, 1, "2024-12-30", "2025-01-05"),
+        (2026, 1, "2025-12-29", "2026-01-04"),
+        (2026, 53, "2026-12-28", "2027-01-03"),
+    ],
+)
+def test_iso_week_range_across_year_boundary(client, year, week, start_date, end_date):
+    response = client.get(f"/api/v1/week/{year}/{week}")
+
+    assert response.status_code == 200
+    data = response.json()
+    assert (data["year"], data["week"]) == (year, week)
+    assert data["start_date"] == start_date
+    assert data["end_date"] == end_date
+
+
+@pytest.mark.parametrize(
+    "path",
+    [
+        "/api/v1/week/2021/53",
+        "/api/v1/week/2026/0",
+        "/api/v1/week/2026/54",
+        "/api/v1/week/9999/52",
+        "/api/v1/week/9999/51?prefetch=true",
+        "/api/v1/week/1/1?prefetch=true",
+    ],
+)
+def test_invalid_or_unrepresentable_week_returns_400(client, path):
+    response = client.get(path)
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid ISO week"
+
+
+def test_week_includes_sunday_late_events_and_excludes_next_monday(client, add_events):
+    add_events(
+        datetime(2025, 12, 28, 23, 59),  # 上一周的周日
+        datetime(2025, 12, 29, 0, 0),  # 周一 0 点
+        datetime(2026, 1, 1, 12, 0),
+        datetime(2026, 1, 4, 23, 59),  # 周日 23:59
+        datetime(2026, 1, 4, 23, 59, 59, 999999),
+        datetime(2026, 1, 5, 0, 0),  # 下一周的周一 0 点
+    )
+
+    response = client.get("/api/v1/week/2026/1")
+
+    assert response.status_code == 200
+    assert event_dates(response) == [
+        "2025-12-29T00:00:00",
+        "2026-01-01T12:00:00",
+        "2026-01-04T23:59:00",
+        "2026-01-04T23:59:59.999999",
+    ]
+
+
+def test_week_53_spanning_new_year(client, add_events):
+    add_events(datetime(2020, 12, 31, 9, 0), datetime(2021, 1, 3, 23, 59))
+
+    response = client.get("/api/v1/week/2020/53")
+
+    assert event_dates(response) == ["2020-12-31T09:00:00", "2021-01-03T23:59:00"]
+
+
+def test_prefetch_returns_adjacent_weeks_in_one_window(client, add_events):
+    add_events(
+        datetime(2025, 12, 21, 23, 59),  # 窗口之前
+        datetime(2025, 12, 22, 8, 0),  # 上一周（2025-W52）周一
+        datetime(2026, 1, 1, 12, 0),
+        datetime(2026, 1, 11, 23, 59),  # 下一周（2026-W02）周日
+        datetime(2026, 1, 12, 0, 0),  # 窗口之后
+    )
+
+    response = client.get("/api/v1/week/2026/1?prefetch=true")
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["start_date"] == "2025-12-29"
+    assert data["end_date"] == "2026-01-04"
+    assert data["window_start"] == "2025-12-22"
+    assert data["window_end"] == "2026-01-11"
+    assert data["previous"] == {"year": 2025, "week": 52}
+    assert data["next"] == {"year": 2026, "week": 2}
+    assert event_dates(response) == [
+        "2025-12-22T08:00:00",
+        "2026-01-01T12:00:00",
+        "2026-01-11T23:59:00",
+    ]
+
+
+def test_prefetch_around_week_53(client):
+    data = client.get("/api/v1/week/2020/53?prefetch=true").json()
+
+    assert data["previous"] == {"year": 2020, "week": 52}
+    assert data["next"] == {"year": 2021, "week": 1}
+    assert data["window_start"] == "2020-12-21"
+    assert data["window_end"] == "2021-01-10"
+
+
+def test_without_prefetch_no_window_fields(client):
+    data = client.get("/api/v1/week/2026/1").json()
+
+    assert "window_start" not in data
+    assert "previous" not in data
@@ -0,0 +1,182 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import event
+
+from app.api import calendar
+from app.core.write_buffer import MAX_FLUSH_ATTEMPTS, WriteBuffer, write_buffer
+from app.models.calendar import CalendarEvent
+
+
+@pytest.fixture
+def event_id(client):
+    response = client.post(
+        "/api/v1/events", json={"date": "2026-01-05T00:00:00", "title": "周一"}
+    )
+    return response.json()["id"]
+
+
+@pytest.fixture
+def stored(session_factory):
+    """直接从数据库读取，不经过写缓冲"""
+
+    def read(event_id):
+        db = session_factory()
+        try:
+            return db.get(CalendarEvent, event_id)
+        finally:
+            db.close()
+
+    return read
+
+
+@pytest.fixture
+def updates(engine):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("UPDATE calendar_events"):
+            statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    yield statements
+    event.remove(engine, "before_cursor_execute", record)
+
+
+@pytest.fixture
+def failing_buffer(monkeypatch):
+    """替换接口使用的写缓冲，failing["on"] 为真时写库失败"""
+    buffer = WriteBuffer()
+    failing = {"on": False}
+    write = buffer._write
+
+    def flaky_write(bind, batch):
+        if failing["on"]:
+            raise RuntimeError("disk I/O error")
+        write(bind, batch)
+
+    monkeypatch.setattr(buffer, "_write", flaky_write)
+    monkeypatch.setattr(calendar, "write_buffer", buffer)
+    return buffer, failing
+
+
+def test_put_then_get_reads_staged_value(client, event_id, stored):
+    created = client.get(f"/api/v1/events/{event_id}").json()
+
+    response = client.put(f"/api/v1/events/{event_id}", json={"morning_9_10": "写周报"})
+
+    assert response.status_code == 200
+    assert response.json()["morning_9_10"] == "写周报"
+    assert response.json()["updated_at"] > created["updated_at"]
+    # 尚未落盘，读取单个事件仍能看到刚写的值
+    assert stored(event_id).morning_9_10 is None
+    fetched = client.get(f"/api/v1/events/{event_id}").json()
+    assert fetched["morning_9_10"] == "写周报"
+    assert fetched["updated_at"] == response.json()["updated_at"]
+
+
+def test_puts_coalesce_into_one_update(client, event_id, stored, updates):
+    for value in ("写", "写周", "写周报"):
+        client.put(f"/api/v1/events/{event_id}", json={"morning_9_10": value})
+    client.put(f"/api/v1/events/{event_id}", json={"evening_20_21": "跑步"})
+
+    assert write_buffer.flush() == 1
+
+    assert len(updates) == 1
+    row = stored(event_id)
+    assert (row.morning_9_10, row.evening_20_21) == ("写周报", "跑步")
+
+
+def test_flushed_update_timestamp_matches_response(client, event_id, stored):
+    response = client.put(f"/api/v1/events/{event_id}", json={"title": "改名"})
+    write_buffer.flush()
+
+    assert stored(event_id).updated_at.isoformat() == response.json()["updated_at"]
+
+
+def test_range_read_flushes_first(client, event_id, stored):
+    client.put(f"/api/v1/events/{event_id}", json={"category": "工作"})
+
+    response = client.get(
+        "/api/v1/events", params={"start_date": "2026-01-05", "category": "工作"}
+    )
+
+    assert [e["id"] for e in response.json()] == [event_id]
+    assert stored(event_id).category == "工作"
+
+
+def test_stop_flushes_pending_changes(session_factory, event_id, stored):
+    buffer = WriteBuffer(window=60)
+    buffer.start()
+    db = session_factory()
+    buffer.stage(db, event_id, {"notes": "关闭前的更新"})
+    db.close()
+
+    buffer.stop()
+
+    assert stored(event_id).notes == "关闭前的更新"
+
+
+def test_delete_discards_staged_changes(client, session_factory, event_id, updates):
+    client.put(f"/api/v1/events/{event_id}", json={"morning_9_10": "写周报"})
+
+    assert client.delete(f"/api/v1/events/{event_id}").status_code == 200
+
+    db = session_factory()
+    assert write_buffer.pending(db, event_id) == {}
+    db.close()
+    assert write_buffer.flush() == 0
+    assert updates == []
+
+
+def test_writes_go_to_the_request_database(client, event_id, stored, updates):
+    # get_db 指向测试数据库，更新必须写回这里而不是默认的 calendar.db
+    client.put(f"/api/v1/events/{event_id}", json={"notes": "测试库"})
+    write_buffer.flush()
+
+    assert len(updates) == 1
+    assert stored(event_id).notes == "测试库"
+
+
+def test_failed_writes_are_kept_and_surfaced(client, event_id, stored, failing_buffer):
+    buffer, failing = failing_buffer
+    client.put(f"/api/v1/events/{event_id}", json={"morning_9_10": "写周报"})
+    failing["on"] = True
+
+    for _ in range(MAX_FLUSH_ATTEMPTS + 1):
+        assert buffer.flush() == 0
+    assert buffer.counters["failed_writes"] == 1
+
+    # 下次读取或更新时同步重试，仍然失败则返回 503，新的更新不会被接受
+    response = client.get(f"/api/v1/events/{event_id}")
+    assert response.status_code == 503
+    assert "disk I/O error" in response.json()["detail"]
+    response = client.put(f"/api/v1/events/{event_id}", json={"notes": "新的"})
+    assert response.status_code == 503
+
+    failing["on"] = False
+    response = client.get(f"/api/v1/events/{event_id}")
+    assert response.status_code == 200
+    assert response.json()["morning_9_10"] == "写周报"
+    assert response.json()["notes"] is None
+    assert stored(event_id).morning_9_10 == "写周报"
+    assert buffer.counters["recovered"] == 1
+
+
+def test_event_deleted_during_failed_flush_is_not_revived(
+    session_factory, event_id, monkeypatch
+):
+    buffer = WriteBuffer()
+    db = session_factory()
+
+    def delete_then_fail(bind, batch):
+        buffer.discard(db, event_id)
+        raise RuntimeError("database is locked")
+
+    monkeypatch.setattr(buffer, "_write", delete_then_fail)
+    buffer.stage(db, event_id, {"notes": "已删除"})
+
+    assert buffer.flush() == 0
+    assert buffer.pending(db, event_id) == {}
+    assert buffer.flush() == 0
+    db.close()
@@ -10,6 +10,8 @@ export default defineConfig({
       '/api': {
         target: 'http://127.0.0.1:8000',
         changeOrigin: true,
+        // 转发 X-Forwarded-For，后端限流按真实客户端区分
+        xfwd: true,
       }
     }
   },